@@ -1,7 +1,52 @@
-import json
+import asyncio, functools, json, re
 from pathlib import Path
-from openai import OpenAI
+from typing import Optional, TYPE_CHECKING
 
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+if TYPE_CHECKING:
+    # openai pulls in httpx and pydantic, so it's imported only once needed
+    from openai import OpenAI
+
+SYSTEM_PROMPT = (
+    "Summarize the academic citation as 'FirstAuthorLastName: Topic', topic under 5 words. "
+    "Use established scientific abbreviations (oligodendrocyte progenitor cell -> OPC) "
+    "and maximize distinguishability.\n"
+    "Example: 'Sim FJ. CD140a identifies a population of highly myelinogenic ... human "
+    "oligodendrocyte progenitor cells' -> 'Sim: Engrafting OPC CD140a subpopulation'"
+)
+
+# above this many pending citations, summaries go through the (cheaper, slower) batch api
+BATCH_THRESHOLD = 8
+# requests in flight at once, a failed batch can leave any number to send directly
+MAX_CONCURRENT_REQUESTS = 4
+
+# first author + title sentence of a pubmed style citation
+_GIST_RE = re.compile(r'^([A-Z][a-z]+ [A-Z]{1,3})[^.]*\.\s*([^.]{0,120})')
+
+def citationGist(citation: str) -> str:
+    """reduces citation to first author and title, the only parts a summary needs"""
+    match = _GIST_RE.match(citation)
+    if match:
+        return f"{match.group(1)}. {match.group(2).strip()}"
+    return citation[:200]
+
+def summaryRequest(citation: str) -> dict:
+    """builds chat completion arguments for summarizing one citation"""
+    return {
+        "model": "gpt-4o-mini",  # using mini for cost efficiency
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Summarize this citation:\n\n{citationGist(citation)}"}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 30,
+    }
+
+# one sync client per api key, so every helper shares its connection pool
+_clients: dict[str, "OpenAI"] = {}
+
+@functools.lru_cache(maxsize=1)
 def loadApiKey(
     config_path: Path = Path(__file__).parent / "cfg" / "openai_key.json"
 ) -> str:
@@ -12,75 +57,183 @@ def loadApiKey(
         print(f"Error loading API key: {e}")
         return ""
 
+def getClient(api_key: str) -> "OpenAI":
+    """returns the shared sync client for api_key, creating it on first use"""
+    if api_key not in _clients:
+        from openai import OpenAI
+        _clients[api_key] = OpenAI(api_key=api_key)
+    return _clients[api_key]
+
 class OpenAIHelper:
     """handles openai requests for citation summarization"""
     
     def __init__(self) -> None:
+        self.api_key = loadApiKey()
+        self.enabled = bool(self.api_key)
+        self.client = None  # sync client, used for the batch api
+        if not self.enabled:
+            print("OpenAI disabled - no API key found")
+            return
         try:
-            api_key = loadApiKey()
-            if api_key:
-                self.client = OpenAI(api_key=api_key)
-                self.enabled = True
-            else:
-                self.client = None
-                self.enabled = False
-                print("OpenAI disabled - no API key found")
+            self.client = getClient(self.api_key)
         except Exception as e:
-            print(f"OpenAI initialization failed: {e}") 
-            self.client = None
+            print(f"OpenAI initialization failed: {e}")
             self.enabled = False
     
-    def generateCitationSummaries(self, citations: list[str]) -> dict[str, str]:
-        """generates short summaries for citations"""
+    async def generateCitationSummaries(self, citations: dict[str, str]) -> dict[str, str]:
+        """generates short summaries for citations (uid -> text), up to MAX_CONCURRENT_REQUESTS at once"""
         if not self.enabled or not citations:
             return {}
         
         try:
-            system_prompt = (
-                "You are a citation summarizer. For each academic citation, extract the first author's last name "
-                "and create a summary phrase with less than 5 words of the main topic. Format: 'LastName: Topic Summary'\n"
-                "Scientific terms can use their established abbreviations, eg. Oligodendrocyte => OL, Oligodendrocyte progenitor cell => OPC"
-                ""
-                "Examples:\n"
-                "- 'Smith et al. Neural networks in visual cortex...' -> 'Smith: NN in visual cortex'\n"
-                "- 'Johnson AB, Lee C. CRISPR gene editing...' -> 'Johnson: CRISPR Editing'\n"
-                "- 'Brown M. Synaptic plasticity mechanisms...' -> 'Brown: Synaptic Plasticity Mech.'\n"
-                "- 'Sim FJ. CD140a identifies a population of highly myelinogenic, migration-competent and"
-                " efficiently engrafting human oligodendrocyte progenitor cells' -> 'Sim: Engrafting OPC CD140a subpopulation'\n"
-                "chondroitin sulfate proteoglycans -> CSPG. You may search the web for best scientific abbrs,"
-                " especially those gene, protein and cell names."
-                "Keep summaries short and informative, maximizing the distinguishability."
-            )
+            from openai import AsyncOpenAI
             
-            # batch citations for efficiency
-            batched_prompt = "Summarize each citation, be sure to maximize the distinguishability.:\n\n" + \
-                           "\n".join(f"{i+1}. {citation[:200]}" for i, citation in enumerate(citations))
+            # bounded fan-out, so a big backlog doesn't run into rate limits
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
             
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # using mini for cost efficiency
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": batched_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=800,
-            )
-            
-            # parse response back to dict
-            response_text = resp.choices[0].message.content.strip()
-            summaries = {}
-            
-            lines = response_text.split('\n')
-            for i, line in enumerate(lines):
-                if line.strip() and i < len(citations):
-                    # remove numbering if present
-                    clean_line = line.strip()
-                    if clean_line.startswith(f"{i+1}."):
-                        clean_line = clean_line[len(f"{i+1}."):].strip()
-                    summaries[citations[i]] = clean_line
-            
-            return summaries
+            async def summarize(client, citation: str):
+                async with semaphore:
+                    return await client.chat.completions.create(**summaryRequest(citation))
             
+            # async client is bound to the running loop, so open one per run
+            async with AsyncOpenAI(api_key=self.api_key) as client:
+                responses = await asyncio.gather(*[
+                    summarize(client, citation) for citation in citations.values()
+                ], return_exceptions=True)
         except Exception as e:
             print(f"OpenAI request failed: {e}")
             return {}
+        
+        # pair responses back with their citations
+        summaries = {}
+        for uid, resp in zip(citations, responses):
+            if isinstance(resp, Exception):
+                print(f"OpenAI request failed: {resp}")
+                continue
+            # an exception escaping the worker thread would abort the app
+            try:
+                summary = (resp.choices[0].message.content or "").strip()
+            except (LookupError, AttributeError) as e:
+                print(f"Skipping unreadable OpenAI response: {e}")
+                continue
+            if summary:
+                summaries[uid] = summary
+        
+        return summaries
+    
+    def submitSummaryBatch(self, citations: dict[str, str]) -> str:
+        """uploads summary requests as a batch job, returns the batch id ("" on failure)"""
+        if not self.enabled or not citations:
+            return ""
+        
+        try:
+            lines = [
+                json.dumps({
+                    "custom_id": uid,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": summaryRequest(citation),
+                }, ensure_ascii=False)
+                for uid, citation in citations.items()
+            ]
+            batch_file = self.client.files.create(
+                file=("citation_summaries.jsonl", "\n".join(lines).encode('utf-8')),
+                purpose="batch",
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            print(f"Submitted summary batch {batch.id} for {len(citations)} citations")
+            return batch.id
+        except Exception as e:
+            print(f"OpenAI batch submission failed: {e}")
+            return ""
+    
+    def fetchSummaryBatch(self, batch_id: str) -> Optional[dict[str, str]]:
+        """
+        checks a batch job.\n
+        Returns None while still running or unreachable, otherwise the summaries it
+        produced keyed by citation uid (partial if it expired or was cancelled,
+        empty if it failed)
+        """
+        if not self.enabled:
+            return None
+        
+        # only network errors mean "ask again later", anything after that must end the batch
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+                return None
+            # expired and cancelled batches still keep (and bill) what they finished
+            output = self.client.files.content(batch.output_file_id).text if batch.output_file_id else ""
+        except Exception as e:
+            print(f"OpenAI batch check failed: {e}")
+            return None
+        
+        if batch.status != "completed":
+            print(f"Summary batch {batch_id} ended with status {batch.status}")
+        
+        # custom ids are the citation uids
+        summaries = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                summary = (response["body"]["choices"][0]["message"]["content"] or "").strip()
+                if summary:
+                    summaries[result["custom_id"]] = summary
+            except (ValueError, LookupError, TypeError, AttributeError) as e:
+                print(f"Skipping unreadable batch result: {e}")
+        
+        return summaries
+
+
+class WorkerSignals(QObject):
+    """signals emitted by SummaryWorker"""
+    
+    summariesReady = pyqtSignal(dict)  # citation uid -> summary
+    batchSubmitted = pyqtSignal(str)  # batch id
+    batchClosed = pyqtSignal(str, dict)  # batch id, citation uid -> summary
+
+class SummaryWorker(QRunnable):
+    """runs the openai summary request off the GUI thread"""
+    
+    def __init__(self, helper: OpenAIHelper, citations: dict[str, str]) -> None:
+        super().__init__()
+        self.helper = helper
+        self.citations = citations
+        self.signals = WorkerSignals()
+    
+    def run(self) -> None:
+        summaries = {}
+        try:
+            if len(self.citations) > BATCH_THRESHOLD:
+                batch_id = self.helper.submitSummaryBatch(self.citations)
+                if batch_id:
+                    self.signals.batchSubmitted.emit(batch_id)
+                    return
+            summaries = asyncio.run(self.helper.generateCitationSummaries(self.citations))
+        finally:
+            # always report back so pending citations are released
+            self.signals.summariesReady.emit(summaries)
+
+class BatchPollWorker(SummaryWorker):
+    """checks a pending summary batch off the GUI thread"""
+    
+    def __init__(self, helper: OpenAIHelper, batch_id: str) -> None:
+        super().__init__(helper, {})
+        self.batch_id = batch_id
+    
+    def run(self) -> None:
+        try:
+            summaries = self.helper.fetchSummaryBatch(self.batch_id)
+            if summaries is not None:
+                self.signals.batchClosed.emit(self.batch_id, summaries)
+        finally:
+            self.signals.summariesReady.emit({})
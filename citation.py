@@ -1,11 +1,28 @@
+from collections import OrderedDict
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
-import re, json
+import re, uuid
 
 from pathlib import Path
 
-from ai import OpenAIHelper
+import orjson
+
+from PyQt6.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+
+from ai import OpenAIHelper, SummaryWorker, BatchPollWorker
+
+BATCH_POLL_INTERVAL = 60  # seconds between checks on pending summary batches
+SUMMARY_DEBOUNCE_MS = 2000  # adds within this window share one summary request
+COMPACT_EVERY = 20  # unsaved in-place changes before the log gets rewritten
+LIBRARY_CACHE_SIZE = 4  # recently left libraries kept parsed in memory
+READ_BUFFER_SIZE = 128 * 1024  # default 8 KiB means many read calls on big logs
+
+# citation detection patterns, compiled once
+_PMID_RE = re.compile(r'PMID:\s*(\d+)', re.IGNORECASE)
+_DOI_RE = re.compile(r'doi:\s*10\.\d+')  # real DOI format
+_JOURNAL_RE = re.compile(r'\d{4}[;\s][A-Za-z\s]+\d+\(\d+\):\d+')
+_AUTHOR_RE = re.compile(r'^[A-Z][a-z]+\s+[A-Z]{1,3}[a-z]*.*\d{4}')
 
 @dataclass
 class Citation:
@@ -15,42 +32,196 @@ class Citation:
     pmid: Optional[str] = None
     notes: str = ""  
     summary: str = ""
+    batch_id: Optional[str] = None  # pending openai summary batch
+    uid: str = field(default_factory=lambda: uuid.uuid4().hex)  # stable identity for the UI
+    # display strings derived from text, built once
+    _preview: str = field(init=False, default="", repr=False, compare=False)
+    _tooltip: str = field(init=False, default="", repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self._preview = self.text[:60] + "..." if len(self.text) > 60 else self.text
+        self._tooltip = f"Full text: {self.text[:200]}..."
+
+def libraryFile(library_name: str, suffix: str = ".jsonl") -> Path:
+    """path of a library's data file (".json" for the old single-document format)"""
+    return Path.home() / f".pubmed_citations_{library_name}{suffix}"
+
+def toRecord(citation: Citation) -> dict:
+    """converts citation to a serializable record"""
+    return {
+        'text': citation.text,
+        'timestamp': citation.timestamp,  # orjson writes datetimes as iso strings
+        'pmid': citation.pmid,
+        'notes': citation.notes,
+        'summary': citation.summary,  # include summary
+        'batch_id': citation.batch_id,
+        'uid': citation.uid,
+    }
+
+def fromRecord(item: dict) -> Citation:
+    """converts a stored record back to Citation"""
+    citation = Citation(
+        text=item['text'],
+        timestamp=datetime.fromisoformat(item['timestamp']),
+        pmid=item.get('pmid'),
+        notes=item.get('notes', ''),
+        summary=item.get('summary', ''),  # load summary
+        batch_id=item.get('batch_id'),
+    )
+    if item.get('uid'):  # older records get a fresh one
+        citation.uid = item['uid']
+    return citation
+
+def readLog(path: Path) -> tuple[list[Citation], int]:
+    """
+    reads a citation log, one json record per line.\n
+    A later record of the same uid replaces the earlier one, a removal record
+    drops it. Also returns how many lines were superseded or unreadable
+    """
+    by_uid: dict[str, Citation] = {}  # keeps the position of the first record
+    stale = 0
+    with open(path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                item = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                # e.g. a partly written last line
+                print(f"Skipping unreadable citation record: {e}")
+                stale += 1
+                continue
+            if item.get('removed'):
+                by_uid.pop(item['uid'], None)
+                stale += 1
+                continue
+            citation = fromRecord(item)
+            if citation.uid in by_uid:
+                stale += 1
+            by_uid[citation.uid] = citation
+    return list(by_uid.values()), stale
+
+def writeLog(path: Path, citations: list[Citation]) -> None:
+    """rewrites (compacts) a citation log"""
+    path.write_bytes(b"".join(
+        orjson.dumps(toRecord(citation)) + b"\n" for citation in citations
+    ))
 
-class CitationManager:
+class CitationManager(QObject):
     """manages citation collection and validation"""
     
+    summariesUpdated = pyqtSignal(dict)  # citation uid -> new summary
+    
     def __init__(self, library_name: str = "default") -> None:
+        super().__init__()
         self.library_name = library_name
         self.citations: list[Citation] = []
-        self.data_file = Path.home() / f".pubmed_citations_{library_name}.json"
+        # lookup indexes over self.citations
+        self._by_text: dict[str, Citation] = {}
+        self._by_pmid: dict[str, Citation] = {}
+        self._by_uid: dict[str, Citation] = {}
+        self.data_file = libraryFile(library_name)
+        self._lib_cache: OrderedDict[str, list[Citation]] = OrderedDict()
+        self.unsaved_changes = 0  # in-place edits not yet written to the log
         self.openai_helper = OpenAIHelper()
+        self.summarizing: set[str] = set()  # uids with a request in flight
+        self.workers: set[SummaryWorker] = set()  # keeps workers alive until they report back
         self.loadCitations()
+        
+        # coalesces bursts of adds into one summary request
+        self.summary_timer = QTimer(self)
+        self.summary_timer.setSingleShot(True)
+        self.summary_timer.setInterval(SUMMARY_DEBOUNCE_MS)
+        self.summary_timer.timeout.connect(self.requestSummaries)
+        
+        # pending summary batches take minutes to hours, check now and then
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setInterval(BATCH_POLL_INTERVAL * 1000)
+        self.batch_timer.timeout.connect(self.pollSummaryBatches)
+        self.updateBatchTimer()
+        self.pollSummaryBatches()
 
     def switchLibrary(self, library_name: str) -> None:
         """switches to a different library"""
-        # save current library first
-        self.saveCitations()
+        # a scheduled request reads self.citations, so send it before they change
+        self.flushSummaryRequest()
+        # save current library first, so the cached copy matches the disk
+        self.flush()
+        self.cacheLibrary(self.library_name, self.citations)
         
         # switch to new library
         self.library_name = library_name
-        self.data_file = Path.home() / f".pubmed_citations_{library_name}.json"
-        self.citations.clear()
-        self.loadCitations()
+        self.data_file = libraryFile(library_name)
+        self._clearIndex()
+        
+        cached = self._lib_cache.pop(library_name, None)
+        if cached is None:
+            self.citations = []
+            self.loadCitations()
+        else:
+            # recently used, skip parsing the log again
+            self.citations = cached
+            for citation in self.citations:
+                self._index(citation)
+            print(f"Loaded {len(self.citations)} citations from cache")
+        
+        self.updateBatchTimer()
+    
+    def cacheLibrary(self, library_name: str, citations: list[Citation]) -> None:
+        """keeps a library that is not open parsed, dropping the least recently used one"""
+        self._lib_cache[library_name] = citations
+        self._lib_cache.move_to_end(library_name)
+        if len(self._lib_cache) > LIBRARY_CACHE_SIZE:
+            self._lib_cache.popitem(last=False)
+    
+    def libraryCitations(self, library_name: str) -> dict[str, Citation]:
+        """
+        citations of any library by uid.\n
+        Background results may arrive after the user switched library, so they
+        are matched against the library they were requested for
+        """
+        if library_name == self.library_name:
+            return self._by_uid
+        
+        citations = self._lib_cache.get(library_name)
+        if citations is None:
+            # dropped from the cache meanwhile, read it back in
+            citations = []
+            data_file = libraryFile(library_name)
+            try:
+                if data_file.exists():
+                    citations, _ = readLog(data_file)
+            except Exception as e:
+                print(f"Error loading citations: {e}")
+        self.cacheLibrary(library_name, citations)
+        return {c.uid: c for c in citations}
+    
+    def libraryChanged(self, library_name: str) -> None:
+        """persists in-place changes made to any library"""
+        if library_name == self.library_name:
+            self.markDirty()
+            return
+        
+        # not open, so nothing would flush it later; write it out now
+        try:
+            writeLog(libraryFile(library_name), self._lib_cache[library_name])
+        except Exception as e:
+            print(f"Error saving citations: {e}")
     
     def getAvailableLibraries(self) -> list[str]:
         """returns list of existing libraries"""
         home = Path.home()
-        library_files = home.glob(".pubmed_citations_*.json")
-        libraries = []
+        # matches both the log files and not yet migrated .json files
+        library_files = home.glob(".pubmed_citations_*.json*")
+        libraries = set()
         
         for file in library_files:
             # extract library name from filename
             name = file.stem.replace(".pubmed_citations_", "")
-            libraries.append(name)
+            libraries.add(name)
         
         # always include default if not found
-        if "default" not in libraries:
-            libraries.append("default")
+        libraries.add("default")
         
         return sorted(libraries)
     
@@ -72,19 +243,25 @@ class CitationManager:
             print("Skipping - detected as code")
             return False
         
-        # must have actual citation structure, not just keywords
-        has_pmid = bool(re.search(r'PMID:\s*\d+', text))
-        has_doi = bool(re.search(r'doi:\s*10\.\d+', text))  # real DOI format
-        has_journal_format = bool(re.search(r'\d{4}[;\s][A-Za-z\s]+\d+\(\d+\):\d+', text))
-        has_author_year = bool(re.search(r'^[A-Z][a-z]+\s+[A-Z]{1,3}[a-z]*.*\d{4}', text))
-        
-        # require at least 1 strong indicator
-        strong_indicators = [has_pmid, has_doi, has_journal_format and has_author_year]
-        weak_indicators = ['epub' in text.lower(), 'pmcid:' in text.lower()]
+        # must have actual citation structure, not just keywords.
+        # 1 strong indicator suffices, so test cheapest first and stop at the first hit;
+        # substring checks gate the regexes since most clipboard text has neither
+        lowered = text.lower()
+        if 'pmid:' in lowered and _PMID_RE.search(text):  # any case, like the pattern
+            print("Citation detection - PMID found")
+            return True
+        if 'doi:' in text and _DOI_RE.search(text):
+            print("Citation detection - DOI found")
+            return True
+        # author pattern is anchored at the start, so it fails faster than the journal one
+        if _AUTHOR_RE.match(text) and _JOURNAL_RE.search(text):
+            print("Citation detection - author and journal format found")
+            return True
         
-        result = sum(strong_indicators) >= 1 or sum(weak_indicators) >= 2
+        # otherwise require both weak indicators
+        result = 'epub' in lowered and 'pmcid:' in lowered
         
-        print(f"Citation detection - PMID: {has_pmid}, DOI: {has_doi}, Journal: {has_journal_format}, Author: {has_author_year}, Result: {result}")
+        print(f"Citation detection - no strong indicator, Result: {result}")
         return result
     
     def addCitation(self, text: str, notes: str = "") -> bool:
@@ -94,32 +271,35 @@ class CitationManager:
         True if append citation list, False if not (duplicative);
         "note_appended" if duplicative but with new notes
         """
-        if not self.isPubmedCitation(text):
+        # canonical forms, computed once
+        stripped = text.strip()
+        note = notes.strip()
+        
+        if not self.isPubmedCitation(stripped):
             return False
         
         # extract PMID if present
-        pmid_match = re.search(r'PMID:\s*(\d+)', text, re.IGNORECASE)
+        pmid_match = _PMID_RE.search(stripped)
         pmid = pmid_match.group(1) if pmid_match else None
         
-        # check for existing citation
-        existing_citation = None
-        for citation in self.citations:
-            if citation.text == text.strip():
-                existing_citation = citation
-                break
+        # check for existing citation, same text or same PMID
+        existing_citation = self._by_text.get(stripped)
+        if existing_citation is None and pmid:
+            existing_citation = self._by_pmid.get(pmid)
         
         if existing_citation:
             # citation already exists - append note if new note provided
-            if notes.strip():
+            if note:
                 if existing_citation.notes:
                     # append with separator if existing notes exist
-                    existing_citation.notes += f"\n---\n{notes.strip()}"
+                    existing_citation.notes += f"\n---\n{note}"
                 else:
                     # first note for this citation
-                    existing_citation.notes = notes.strip()
+                    existing_citation.notes = note
                 
-                self.saveCitations()  # save the updated notes
-                print(f"Appended note to existing citation: {notes[:50]}...")
+                # the user typed it, so log it now; the newer record wins on load
+                self.appendCitation(existing_citation)
+                print(f"Appended note to existing citation: {note[:50]}...")
                 return "note_appended" # not complying with function typing!!
             else:
                 print("Citation already exists, no new note to append")
@@ -127,73 +307,213 @@ class CitationManager:
         else:
             # new citation - add it
             citation = Citation(
-                text=text.strip(),
+                text=stripped,
                 timestamp=datetime.now(),
                 pmid=pmid,
-                notes=notes,
+                notes=note,
                 summary="",
             )
             
             self.citations.append(citation)
-            self.saveCitations()
+            self._index(citation)
+            self.appendCitation(citation)
             self.updateSummaries()
             return True
     
     def updateSummaries(self) -> None:
-        """updates AI summaries for **all** citations"""
+        """schedules a summary request, restarting the wait if one is already scheduled"""
+        if self.openai_helper.enabled:
+            self.summary_timer.start()
+    
+    def flushSummaryRequest(self) -> None:
+        """sends a scheduled summary request now instead of after the wait"""
+        if self.summary_timer.isActive():
+            self.summary_timer.stop()
+            self.requestSummaries()
+    
+    def requestSummaries(self) -> None:
+        """requests AI summaries in the background for citations that don't have one yet"""
         if not self.openai_helper.enabled:
             return
         
-        # find citations without summaries
-        citations_needing_summary = [
-            c.text for c in self.citations # if not c.summary
-        ]
+        # find citations without summaries (texts are unique through the text index)
+        citations_needing_summary = {
+            c.uid: c.text for c in self.citations
+            if not c.summary and not c.batch_id and c.uid not in self.summarizing
+        }
         
         if not citations_needing_summary:
             return
         
         print(f"Requesting summaries for {len(citations_needing_summary)} citations...")
+        self.summarizing.update(citations_needing_summary)
+        
+        # get summaries from gpt without blocking the event loop;
+        # results go to this library even if another one is open by then
+        library = self.library_name
+        worker = SummaryWorker(self.openai_helper, citations_needing_summary)
+        worker.signals.summariesReady.connect(
+            lambda summaries: self.onSummariesReady(worker, library, summaries)
+        )
+        worker.signals.batchSubmitted.connect(
+            lambda batch_id: self.onBatchSubmitted(worker, library, batch_id)
+        )
+        self.workers.add(worker)
+        QThreadPool.globalInstance().start(worker)
+    
+    def pollSummaryBatches(self) -> None:
+        """checks pending summary batches in the background"""
+        if not self.openai_helper.enabled:
+            return
+        
+        # skip batches that are already being checked
+        polling = {w.batch_id for w in self.workers if isinstance(w, BatchPollWorker)}
+        pending = {c.batch_id for c in self.citations if c.batch_id} - polling
         
-        # get summaries from gpt
-        summaries = self.openai_helper.generateCitationSummaries(citations_needing_summary)
+        library = self.library_name
+        for batch_id in pending:
+            worker = BatchPollWorker(self.openai_helper, batch_id)
+            worker.signals.summariesReady.connect(
+                lambda summaries, worker=worker: self.onSummariesReady(worker, library, summaries)
+            )
+            worker.signals.batchClosed.connect(
+                lambda batch_id, summaries: self.onBatchClosed(library, batch_id, summaries)
+            )
+            self.workers.add(worker)
+            QThreadPool.globalInstance().start(worker)
+    
+    def updateBatchTimer(self) -> None:
+        """runs the batch check timer only while some citation waits on a batch"""
+        if not self.openai_helper.enabled:
+            return
+        if any(c.batch_id for c in self.citations):
+            if not self.batch_timer.isActive():
+                self.batch_timer.start()
+        else:
+            self.batch_timer.stop()
+    
+    def onBatchSubmitted(self, worker: SummaryWorker, library_name: str, batch_id: str) -> None:
+        """remembers which citations of library_name wait on a summary batch"""
+        citations = self.libraryCitations(library_name)
+        waiting = []
+        for uid in worker.citations:
+            citation = citations.get(uid)
+            if citation is not None and not citation.summary:
+                citation.batch_id = batch_id
+                waiting.append(citation)
+        
+        if library_name == self.library_name:
+            # a lost batch id means paying for the batch again, so log it now
+            self.appendRecords([toRecord(citation) for citation in waiting])
+        else:
+            self.libraryChanged(library_name)
+        self.updateBatchTimer()
+    
+    def onBatchClosed(self, library_name: str, batch_id: str, summaries: dict[str, str]) -> None:
+        """applies results of a finished summary batch"""
+        for citation in self.libraryCitations(library_name).values():
+            if citation.batch_id == batch_id:
+                citation.batch_id = None  # failed ones get requested again next time
+        self.libraryChanged(library_name)
+        self.updateBatchTimer()
+        self.applySummaries(library_name, summaries)
+        print(f"Summary batch {batch_id} closed with {len(summaries)} summaries")
+    
+    def onSummariesReady(self, worker: SummaryWorker, library_name: str, summaries: dict[str, str]) -> None:
+        """applies summaries delivered by the background worker"""
+        self.workers.discard(worker)
+        self.summarizing.difference_update(worker.citations)
+        self.applySummaries(library_name, summaries)
+    
+    def applySummaries(self, library_name: str, summaries: dict[str, str]) -> None:
+        """stores summaries (uid -> summary) and notifies listeners about the changed ones"""
+        citations = self.libraryCitations(library_name)
+        updated = {}
+        for uid, summary in summaries.items():
+            citation = citations.get(uid)
+            if citation is not None:  # may have been removed meanwhile
+                citation.summary = summary
+                updated[uid] = summary
         
-        # update citations with summaries
-        for citation in self.citations:
-            if citation.text in summaries:
-                citation.summary = summaries[citation.text]
+        if not updated:
+            return
         
         # save updated citations
-        self.saveCitations()
-        print(f"Updated {len(summaries)} citation summaries")
+        self.libraryChanged(library_name)
+        print(f"Updated {len(updated)} citation summaries")
+        if library_name == self.library_name:  # the list only shows the open library
+            self.summariesUpdated.emit(updated)
+    
+    def getCitation(self, uid: str) -> Optional[Citation]:
+        """returns citation with given uid, None if not found"""
+        return self._by_uid.get(uid)
     
-    def removeCitation(self, index: int) -> None:
-        """removes citation at given index"""
-        if 0 <= index < len(self.citations):
-            del self.citations[index]
-            self.saveCitations()  # auto-save after removing
+    def removeCitation(self, uid: str) -> None:
+        """removes citation with given uid"""
+        citation = self._by_uid.get(uid)
+        if citation is not None:
+            self.citations.remove(citation)
+            self._unindex(citation)
+            self.appendRecords([{'uid': citation.uid, 'removed': True}])
     
     def clearAll(self) -> None:
         """removes all citations"""
         self.citations.clear()
-        self.saveCitations()  # auto-save after clearing
+        self._clearIndex()
+        self.saveCitations()  # rewriting an empty log is cheap
+    
+    def _index(self, citation: Citation) -> None:
+        """adds citation to the lookup indexes"""
+        self._by_text[citation.text] = citation
+        self._by_uid[citation.uid] = citation
+        if citation.pmid:
+            self._by_pmid[citation.pmid] = citation
+    
+    def _unindex(self, citation: Citation) -> None:
+        """drops citation from the lookup indexes"""
+        if self._by_text.get(citation.text) is citation:
+            del self._by_text[citation.text]
+        self._by_uid.pop(citation.uid, None)
+        if citation.pmid and self._by_pmid.get(citation.pmid) is citation:
+            del self._by_pmid[citation.pmid]
+    
+    def _clearIndex(self) -> None:
+        """empties the lookup indexes"""
+        self._by_text.clear()
+        self._by_pmid.clear()
+        self._by_uid.clear()
+    
+    def appendCitation(self, citation: Citation) -> None:
+        """appends a new or updated citation to the log on disk"""
+        self.appendRecords([toRecord(citation)])
+    
+    def appendRecords(self, records: list[dict]) -> None:
+        """appends records to the log on disk"""
+        if not records:
+            return
+        try:
+            # buffered on purpose: a raw write may stop short, the buffered one retries until done
+            with open(self.data_file, 'ab') as f:
+                f.write(b"".join(orjson.dumps(record) + b"\n" for record in records))
+        except Exception as e:
+            print(f"Error saving citation: {e}")
+    
+    def markDirty(self) -> None:
+        """records an in-place change, compacting the log every COMPACT_EVERY changes"""
+        self.unsaved_changes += 1
+        if self.unsaved_changes >= COMPACT_EVERY:
+            self.saveCitations()
+    
+    def flush(self) -> None:
+        """writes pending in-place changes to disk"""
+        if self.unsaved_changes:
+            self.saveCitations()
     
     def saveCitations(self) -> None:
-        """saves citations to disk"""
+        """rewrites (compacts) the whole citation log"""
         try:
-            # convert to serializable format
-            data = []
-            for citation in self.citations:
-                data.append({
-                    'text': citation.text,
-                    'timestamp': citation.timestamp.isoformat(),
-                    'pmid': citation.pmid,
-                    'notes': citation.notes,
-                    'summary': citation.summary  # include summary
-                })
-            
-            # save json
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            writeLog(self.data_file, self.citations)
+            self.unsaved_changes = 0
             
             print(f"Saved {len(self.citations)} citations to {self.data_file}")
             
@@ -204,30 +524,37 @@ class CitationManager:
         """loads citations from disk"""
         try:
             if not self.data_file.exists():
-                print("No saved citations found")
+                legacy_file = libraryFile(self.library_name, ".json")
+                if not legacy_file.exists():
+                    print("No saved citations found")
+                    return
+                
+                # migrate the old single-document format to the log
+                for item in orjson.loads(legacy_file.read_bytes()):
+                    citation = fromRecord(item)
+                    self.citations.append(citation)
+                    self._index(citation)
+                self.saveCitations()
+                print(f"Migrated {len(self.citations)} citations from {legacy_file}")
                 return
             
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # back to Citation
-            for item in data:
-                citation = Citation(
-                    text=item['text'],
-                    timestamp=datetime.fromisoformat(item['timestamp']),
-                    pmid=item.get('pmid'),
-                    notes=item.get('notes', ''),
-                    summary=item.get('summary', '')  # load summary
-                )
-                self.citations.append(citation)
+            # back to Citation, one record per line
+            self.citations, stale = readLog(self.data_file)
+            for citation in self.citations:
+                self._index(citation)
             
             print(f"Loaded {len(self.citations)} citations from {self.data_file}")
+            if stale:
+                # drops superseded records, and a torn last line before anything is appended after it
+                self.saveCitations()
         except KeyError as e:
             print(f'Wrong key in citation loading: {e}')
             self.citations = []
+            self._clearIndex()
         except Exception as e:
             print(f"Error loading citations: {e}")
             self.citations = []
+            self._clearIndex()
     
     def exportCitations(self, file_path: str) -> bool:
         """exports citations to a readable format"""
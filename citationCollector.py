@@ -24,6 +24,7 @@ class CitationWindow(QMainWindow):
         super().__init__()
         self.citation_manager = CitationManager()
         self.clipboard_listener = ClipboardListener()
+        self.active_note_dialog: Optional[QuickNoteDialog] = None  # popup waiting for input
         self.setupUi()
         self.connectSignals()
 
@@ -76,7 +77,10 @@ class CitationWindow(QMainWindow):
         # citations list
         self.citation_list = QListWidget()
         self.citation_list.setMaximumWidth(450)
+        # single-line items, so the view needn't measure each one
+        self.citation_list.setUniformItemSizes(True)
         splitter.addWidget(self.citation_list)
+        self.list_items: dict[str, QListWidgetItem] = {}  # citation uid -> item
         
         # preview panel
         preview_widget = QWidget()
@@ -129,8 +133,7 @@ class CitationWindow(QMainWindow):
         self.clear_btn.clicked.connect(self.clearCitations)    
         self.export_btn.clicked.connect(lambda: exportCitations(self, self.citation_manager.citations))
         self.library_combo.currentTextChanged.connect(self.onLibraryChanged)
-
-        QTimer.singleShot(100, self.checkForSummaryUpdates)
+        self.citation_manager.summariesUpdated.connect(self.onSummariesUpdated)
     
     def testNoteDialog(self) -> None:
         """tests the note dialog manually"""
@@ -146,98 +149,108 @@ class CitationWindow(QMainWindow):
             if self.citation_manager.isPubmedCitation(text):
                 print("Citation detected!")
                 
+                dialog = self.active_note_dialog
+                if dialog is not None and dialog.isActive():
+                    # burst of copies: save the shown citation as if it timed out,
+                    # then reuse the popup for the new one
+                    self.saveCitation(dialog.citation_preview, "")
+                    dialog.rebindCitation(text)
+                    return
+                
                 dialog = QuickNoteDialog(text, self)
+                self.active_note_dialog = dialog
                 result = dialog.exec()
+                self.active_note_dialog = None
                 
                 if result == QDialog.DialogCode.Accepted:
-                    add_result = self.citation_manager.addCitation(text, dialog.notes)
-                    
-                    if add_result == True:
-                        # new citation added
-                        new_citation = self.citation_manager.citations[-1]
-                        self.addCitationToList(new_citation, len(self.citation_manager.citations) - 1)
-                        note_status = " with note" if dialog.notes else ""
-                        self.updateStatus(f"✅ Citation saved{note_status}!")
-                        
-                    elif add_result == "note_appended":
-                        # note was appended to existing citation
-                        self.refreshCitationList()  # refresh to show updated note indicator
-                        self.updateStatus(f"📝 Note appended to existing citation!")
-                        
-                    else:
-                        # duplicate with no new note
-                        self.updateStatus(f"⚠️ Citation already exists")
+                    # the popup may have been rebound to a later citation
+                    self.saveCitation(dialog.citation_preview, dialog.notes)
             else:
                 print("Not detected as citation")
         except Exception as e:
             print(f"Error processing clipboard: {e}")
+    
+    def saveCitation(self, text: str, notes: str) -> None:
+        """adds citation to the library and updates the UI"""
+        add_result = self.citation_manager.addCitation(text, notes)
+        
+        if add_result == True:
+            # new citation added
+            new_citation = self.citation_manager.citations[-1]
+            self.addCitationToList(new_citation)
+            note_status = " with note" if notes else ""
+            self.updateStatus(f"✅ Citation saved{note_status}!")
+            
+        elif add_result == "note_appended":
+            # note was appended to existing citation
+            self.refreshCitationList()  # refresh to show updated note indicator
+            self.updateStatus(f"📝 Note appended to existing citation!")
+            
+        else:
+            # duplicate with no new note
+            self.updateStatus(f"⚠️ Citation already exists")
 
-    def addCitationToList(self, citation: Citation, index: Optional[int] = None) -> None:
+    def addCitationToList(self, citation: Citation, batch: bool = False) -> None:
         """adds citation to the display list"""
+        item = QListWidgetItem()
+        
+        # uid stays valid when other citations are removed
+        item.setData(Qt.ItemDataRole.UserRole, citation.uid)
+        self.formatCitationItem(item, citation)
+        
+        self.citation_list.addItem(item)
+        self.list_items[citation.uid] = item
+        
+        # only update count if we're not in a batch refresh
+        if not batch:
+            self.updateCount()
+    
+    def formatCitationItem(self, item: QListWidgetItem, citation: Citation) -> None:
+        """sets display text and tooltip of a list item"""
         # use summary if available, otherwise fallback to text preview
-        if citation.summary:
-            display_text = citation.summary
-        else:
-            display_text = citation.text[:60] + "..." if len(citation.text) > 60 else citation.text
+        display_text = citation.summary or citation._preview
         
         pmid_text = f" [PMID: {citation.pmid}]" if citation.pmid else ""
         note_indicator = " 📝" if citation.notes else ""
         
-        item_text = f"{citation.timestamp.strftime('%H:%M')}: {display_text}{pmid_text}{note_indicator}"
-        
-        item = QListWidgetItem(item_text)
-        
-        # use provided index or calculate it
-        if index is not None:
-            item.setData(Qt.ItemDataRole.UserRole, index)
-        else:
-            item.setData(Qt.ItemDataRole.UserRole, len(self.citation_manager.citations) - 1)
+        item.setText(f"{citation.timestamp.strftime('%H:%M')}: {display_text}{pmid_text}{note_indicator}")
         
         # add subtle styling
         if citation.summary:
-            item.setToolTip(f"AI Summary: {citation.summary}\n\nFull text: {citation.text[:200]}...")
+            item.setToolTip(f"AI Summary: {citation.summary}\n\n{citation._tooltip}")
         else:
-            item.setToolTip(f"Full text: {citation.text[:200]}...")
-        
-        self.citation_list.addItem(item)
-        
-        # only update count if we're not in a batch refresh
-        if index is None:
-            self.updateCount()
+            item.setToolTip(citation._tooltip)
     
-    def checkForSummaryUpdates(self) -> None:
-        """periodically checks if summaries have been updated"""
-        # check if any citation got a new summary
-        needs_refresh = False
-        for i, citation in enumerate(self.citation_manager.citations):
-            if i < self.citation_list.count():
-                item = self.citation_list.item(i)
-                current_text = item.text()
-                
-                # check if the display should show summary but currently shows truncated text
-                if citation.summary and not citation.summary in current_text:
-                    needs_refresh = True
-                    break
-            else:
-                # list is shorter than citations, definitely need refresh
-                needs_refresh = True
-                break
-        
-        if needs_refresh:
-            print("Refreshing citation list due to new summaries")
-            self.refreshCitationList()
-        
-        # schedule next check
-        QTimer.singleShot(2000, self.checkForSummaryUpdates)
+    def onSummariesUpdated(self, summaries: dict[str, str]) -> None:
+        """updates only the list items whose summary changed"""
+        for uid in summaries:
+            item = self.list_items.get(uid)
+            citation = self.citation_manager.getCitation(uid)
+            if item is not None and citation is not None:
+                self.formatCitationItem(item, citation)
+    
+    def populateCitationList(self) -> None:
+        """adds all citations of the library to the display list"""
+        # repaint once at the end instead of per item
+        self.citation_list.setUpdatesEnabled(False)
+        try:
+            for citation in self.citation_manager.citations:
+                self.addCitationToList(citation, batch=True)
+        finally:
+            self.citation_list.setUpdatesEnabled(True)
+    
+    def clearCitationList(self) -> None:
+        """empties the display list"""
+        self.citation_list.clear()
+        self.list_items.clear()
 
     def refreshCitationList(self) -> None:
-        """rebuilds the citation list with correct indices"""
+        """rebuilds the citation list"""
         # remember current selection
         current_row = self.citation_list.currentRow()
         
-        self.citation_list.clear()
-        for i, citation in enumerate(self.citation_manager.citations):
-            self.addCitationToList(citation, i)  # pass correct index
+        self.clearCitationList()
+        self.populateCitationList()
         
         # restore selection if possible
         if 0 <= current_row < self.citation_list.count():
@@ -247,9 +260,8 @@ class CitationWindow(QMainWindow):
     
     def onCitationSelected(self, item: QListWidgetItem) -> None:
         """handles citation selection"""
-        index = item.data(Qt.ItemDataRole.UserRole)
-        if 0 <= index < len(self.citation_manager.citations):
-            citation: Citation = self.citation_manager.citations[index]
+        citation = self.citation_manager.getCitation(item.data(Qt.ItemDataRole.UserRole))
+        if citation is not None:
             
             # format preview with notes
             preview_text = citation.text
@@ -266,17 +278,11 @@ class CitationWindow(QMainWindow):
         current_row = self.citation_list.currentRow()
         if current_row >= 0:
             item = self.citation_list.item(current_row)
-            index = item.data(Qt.ItemDataRole.UserRole)
+            uid = item.data(Qt.ItemDataRole.UserRole)
             
-            self.citation_manager.removeCitation(index)
+            self.citation_manager.removeCitation(uid)
             self.citation_list.takeItem(current_row)
-            
-            # update indices for remaining items
-            for i in range(self.citation_list.count()):
-                list_item = self.citation_list.item(i)
-                old_index = list_item.data(Qt.ItemDataRole.UserRole)
-                if old_index > index:
-                    list_item.setData(Qt.ItemDataRole.UserRole, old_index - 1)
+            self.list_items.pop(uid, None)
             
             self.preview_text.clear()
             self.remove_btn.setEnabled(False)
@@ -292,7 +298,7 @@ class CitationWindow(QMainWindow):
             )
             if reply == QMessageBox.StandardButton.Yes:
                 self.citation_manager.clearAll()
-                self.citation_list.clear()
+                self.clearCitationList()
                 self.preview_text.clear()
                 self.remove_btn.setEnabled(False)
                 self.updateCount()
@@ -300,8 +306,7 @@ class CitationWindow(QMainWindow):
 
     def loadExistingCitations(self) -> None:
         """loads previously saved citations into the UI"""
-        for i, citation in enumerate(self.citation_manager.citations):
-            self.addCitationToList(citation, i)  # pass the correct index
+        self.populateCitationList()
         
         if self.citation_manager.citations:
             self.updateStatus(f"Loaded {len(self.citation_manager.citations)} saved citations")
@@ -367,7 +372,7 @@ class CitationWindow(QMainWindow):
         self.citation_manager.switchLibrary(library_name)
         
         # update UI
-        self.citation_list.clear()
+        self.clearCitationList()
         self.preview_text.clear()
         self.remove_btn.setEnabled(False)
         
@@ -382,6 +387,8 @@ class CitationWindow(QMainWindow):
     def closeEvent(self, event) -> None:
         """cleanup on window close"""
         self.clipboard_listener.stop()
+        self.citation_manager.flushSummaryRequest()
+        self.citation_manager.flush()
         event.accept()
 
 
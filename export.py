@@ -1,13 +1,18 @@
 import re
 from datetime import datetime
+from operator import attrgetter
 from PyQt6.QtWidgets import (
     QDialog, QLabel, QVBoxLayout,
     QCheckBox, QButtonGroup, QRadioButton,
-    QMessageBox, QFileDialog
+    QMessageBox, QFileDialog, QDialogButtonBox
 )
 
 from citation import Citation
 
+# author sort key patterns, compiled once
+_AUTHOR_RE = re.compile(r'^([A-Z][a-z]+)')
+_NONALPHA_RE = re.compile(r'[^a-zA-Z]')
+
 class ExportDialog(QDialog):
     """dialog for export options"""
     
@@ -47,7 +52,6 @@ class ExportDialog(QDialog):
         layout.addWidget(self.include_notes)
         
         # buttons
-        from PyQt6.QtWidgets import QDialogButtonBox
         buttons = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Ok | 
             QDialogButtonBox.StandardButton.Cancel
@@ -65,23 +69,41 @@ class ExportDialog(QDialog):
             'include_notes': self.include_notes.isChecked()
         }
 
+# one options dialog per parent window, reused so choices persist between exports
+_dialog_cache: dict[int, ExportDialog] = {}
+
+def getExportDialog(parent) -> ExportDialog:
+    """returns the cached export dialog of parent, building it on first use"""
+    key = id(parent)
+    dialog = _dialog_cache.get(key)
+    if dialog is None:
+        dialog = ExportDialog(parent)
+        _dialog_cache[key] = dialog
+        if parent is not None:
+            # the dialog dies with its parent, drop it from the cache then
+            parent.destroyed.connect(lambda: _dialog_cache.pop(key, None))
+    return dialog
+
 def extractFirstAuthor(citation_text: str) -> str:
     """extracts first author last name for sorting"""
+    # the pattern is anchored at the start, trailing whitespace doesn't matter
+    stripped = citation_text.lstrip()
+    
     # try to find author pattern at start of citation
-    match = re.match(r'^([A-Z][a-z]+)', citation_text.strip())
+    match = _AUTHOR_RE.match(stripped)
     if match:
         return match.group(1).lower()
     
-    # fallback - return first word
-    first_word = citation_text.strip().split()[0] if citation_text.strip() else ""
-    return re.sub(r'[^a-zA-Z]', '', first_word).lower()
+    # fallback - return first word, splitting off only that one
+    first_word = stripped.split(None, 1)[0] if stripped else ""
+    return _NONALPHA_RE.sub('', first_word).lower()
 
 def exportCitations(parent, citations: list[Citation]) -> None:
     if not citations:
         QMessageBox.information(parent, "Export", "No citations to export")
         return
 
-    dialog = ExportDialog(parent)
+    dialog = getExportDialog(parent)
     if dialog.exec() != QDialog.DialogCode.Accepted:
         return
 
@@ -96,25 +118,28 @@ def exportCitations(parent, citations: list[Citation]) -> None:
     if not file_path:
         return
 
-    citations_copy = citations.copy()
-
+    # only copy when sorting; keeping the order just reads the list
     if options['sort_by_time']:
-        citations_copy.sort(key=lambda c: c.timestamp, reverse=True)
+        ordered = sorted(citations, key=attrgetter('timestamp'), reverse=True)
     elif options['sort_by_author']:
-        citations_copy.sort(key=lambda c: extractFirstAuthor(c.text))
+        ordered = sorted(citations, key=lambda c: extractFirstAuthor(c.text))
+    else:
+        ordered = citations
 
     try:
+        # build the whole export, then write (and encode) it in one go
+        parts = [f"Citations Export ({len(ordered)} total)\n", "=" * 50 + "\n\n"]
+        for i, citation in enumerate(ordered, 1):
+            line = citation.text
+            if options['include_notes'] and citation.notes:
+                line += f" [note: {citation.notes}]"
+            if options['include_index']:
+                parts.append(f"{i}. {line}\n\n")
+            else:
+                parts.append(f"{line}\n\n")
+        
         with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(f"Citations Export ({len(citations_copy)} total)\n")
-            f.write("=" * 50 + "\n\n")
-            for i, citation in enumerate(citations_copy, 1):
-                line = citation.text
-                if options['include_notes'] and citation.notes:
-                    line += f" [note: {citation.notes}]"
-                if options['include_index']:
-                    f.write(f"{i}. {line}\n\n")
-                else:
-                    f.write(f"{line}\n\n")
+            f.write(''.join(parts))
 
         QMessageBox.information(parent, "Export", f"Exported to:\n{file_path}")
 
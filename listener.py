@@ -1,5 +1,7 @@
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+COALESCE_MS = 50  # apps often set several clipboard formats in a row
 
 class ClipboardListener(QObject):
     """handles clipboard monitoring using signals"""
@@ -11,6 +13,12 @@ class ClipboardListener(QObject):
         self.clipboard = QApplication.clipboard()
         self.last_text = ""
         self.is_monitoring = False
+        
+        # reads the clipboard once a burst of change signals settles
+        self.coalesce_timer = QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.setInterval(COALESCE_MS)
+        self.coalesce_timer.timeout.connect(self.processClipboard)
     
     def start(self) -> None:
         """starts monitoring clipboard"""
@@ -24,13 +32,23 @@ class ClipboardListener(QObject):
         """stops monitoring"""
         if self.is_monitoring:
             self.clipboard.dataChanged.disconnect(self.onClipboardChanged)
+            self.coalesce_timer.stop()
             self.is_monitoring = False
             print("Clipboard monitoring stopped")
     
     def onClipboardChanged(self) -> None:
-        """called when clipboard content changes"""
+        """called when clipboard content changes, (re)starts the coalescing wait"""
+        self.coalesce_timer.start()
+    
+    def processClipboard(self) -> None:
+        """reads the settled clipboard and emits new text"""
         try:
-            current_text = self.clipboard.text()
+            # images / file lists: skip before qt converts anything to text
+            mime_data = self.clipboard.mimeData()
+            if mime_data is None or not mime_data.hasText():
+                return
+            
+            current_text = mime_data.text()
             if current_text and current_text != self.last_text:
                 print(f"Clipboard changed: {current_text[:50]}...")
                 self.last_text = current_text
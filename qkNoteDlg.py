@@ -1,10 +1,12 @@
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal, QTimeLine, QEasingCurve
 from PyQt6.QtWidgets import (
     QTextEdit, QDialog, QHBoxLayout, QVBoxLayout,
     QLabel, QPushButton, QWidget, QApplication
 )
 from PyQt6.QtGui import QKeyEvent
 
+AUTO_SAVE_SECONDS = 5  # popup saves the citation without note after this
+
 class SmartTextEdit(QTextEdit):
     """textEdit with custom enter behavior"""
     
@@ -25,12 +27,29 @@ class SmartTextEdit(QTextEdit):
 class QuickNoteDialog(QDialog):
     """compact expandable popup for quick note-taking"""
     
+    # one stylesheet for all widgets, parsed once per popup instead of per widget
+    _QSS = """
+        QLabel#drag { color: #999; font-size: 8px; }
+        QLabel#preview { font-size: 10px; color: #555; }
+        QLabel#countdown { color: #FF5722; font-size: 10px; font-weight: bold; }
+        QLabel#noteHint { font-size: 10px; color: #666; margin-top: 8px; }
+        QWidget#header:hover { background-color: #f0f0f0; }
+        QPushButton#save, QPushButton#note, QPushButton#skip {
+            color: white; border: none; border-radius: 3px; font-size: 10px;
+        }
+        QPushButton#save { background: #4CAF50; }
+        QPushButton#note { background: #2196F3; }
+        QPushButton#skip { background: #757575; }
+        QTextEdit#noteInput { border: 1px solid #ddd; border-radius: 3px; font-size: 11px; }
+    """
+    
     def __init__(self, citation_preview: str, parent=None) -> None:
         super().__init__(parent)
-        self.citation_preview = citation_preview
+        self.setCitationPreview(citation_preview)
         self.notes = ""
         self.is_expanded = False
         self.drag_start_position = None  # for dragging
+        self.drag_bounds = None  # (max x, max y) on screen, fixed for one drag
         
         self.setupCompactUi()
         
@@ -41,23 +60,42 @@ class QuickNoteDialog(QDialog):
             Qt.WindowType.FramelessWindowHint
         )
         
-        # auto-close timer
-        self.auto_close_timer = QTimer()
-        self.auto_close_timer.setSingleShot(True)
-        self.auto_close_timer.timeout.connect(self.autoClose)
-        self.auto_close_timer.start(5000)
-        
-        # countdown for visual feedback
-        self.countdown_timer = QTimer()
-        self.countdown_timer.timeout.connect(self.updateCountdown)
-        self.countdown_timer.start(1000)
-        self.remaining_seconds = 5
+        # one timeline drives both the countdown label and auto-close,
+        # waking up once per second
+        self.timeline = QTimeLine(AUTO_SAVE_SECONDS * 1000, self)
+        self.timeline.setEasingCurve(QEasingCurve(QEasingCurve.Type.Linear))
+        self.timeline.setFrameRange(AUTO_SAVE_SECONDS, 0)
+        self.timeline.setUpdateInterval(1000)
+        self.timeline.frameChanged.connect(lambda s: self.countdown_label.setText(f"{s}s"))
+        self.timeline.finished.connect(self.autoClose)
+        self.timeline.start()
         
         self.positionBottomRight()
     
+    def setCitationPreview(self, citation_preview: str) -> None:
+        """stores citation text and its truncated previews"""
+        self.citation_preview = citation_preview
+        # truncated previews for the compact and expanded layouts
+        self._short_preview = citation_preview[:35] + "..." if len(citation_preview) > 35 else citation_preview
+        self._long_preview = citation_preview[:90] + "..." if len(citation_preview) > 90 else citation_preview
+    
+    def rebindCitation(self, citation_preview: str) -> None:
+        """shows another citation in this popup and restarts the countdown"""
+        self.setCitationPreview(citation_preview)
+        self.preview_label.setText(self._short_preview)
+        
+        self.timeline.stop()
+        self.countdown_label.setText(f"{AUTO_SAVE_SECONDS}s")
+        self.timeline.start()
+    
+    def isActive(self) -> bool:
+        """whether the popup is up and still untouched (note input not opened)"""
+        return self.isVisible() and not self.is_expanded
+    
     def setupCompactUi(self) -> None:
         """sets up compact initial interface"""
         self.setFixedSize(280, 80)
+        self.setStyleSheet(self._QSS)
         
         layout = QVBoxLayout(self)
         layout.setContentsMargins(8, 8, 8, 8)
@@ -68,7 +106,7 @@ class QuickNoteDialog(QDialog):
         
         # drag handle indicator
         drag_label = QLabel("⋮⋮")
-        drag_label.setStyleSheet("color: #999; font-size: 8px;")
+        drag_label.setObjectName("drag")
         drag_label.setFixedWidth(12)
         header_layout.addWidget(drag_label)
         
@@ -76,15 +114,14 @@ class QuickNoteDialog(QDialog):
         header_layout.addWidget(icon_label)
         
         # very short preview
-        preview = self.citation_preview[:35] + "..." if len(self.citation_preview) > 35 else self.citation_preview
-        self.preview_label = QLabel(preview)
-        self.preview_label.setStyleSheet("font-size: 10px; color: #555;")
+        self.preview_label = QLabel(self._short_preview)
+        self.preview_label.setObjectName("preview")
         self.preview_label.setWordWrap(True)
         header_layout.addWidget(self.preview_label, 1)
         
         # countdown
-        self.countdown_label = QLabel("6s")
-        self.countdown_label.setStyleSheet("color: #FF5722; font-size: 10px; font-weight: bold;")
+        self.countdown_label = QLabel(f"{AUTO_SAVE_SECONDS}s")
+        self.countdown_label.setObjectName("countdown")
         header_layout.addWidget(self.countdown_label)
         
         layout.addWidget(self.createHeaderWidget(header_layout))
@@ -95,16 +132,16 @@ class QuickNoteDialog(QDialog):
         
         self.save_btn = QPushButton("✓ Save")
         self.save_btn.setFixedHeight(24)
-        self.save_btn.setStyleSheet("QPushButton { background: #4CAF50; color: white; border: none; border-radius: 3px; font-size: 10px; }")
+        self.save_btn.setObjectName("save")
         
         self.note_btn = QPushButton("📝 Note")
         self.note_btn.setFixedHeight(24)
-        self.note_btn.setStyleSheet("QPushButton { background: #2196F3; color: white; border: none; border-radius: 3px; font-size: 10px; }")
+        self.note_btn.setObjectName("note")
         
         self.skip_btn = QPushButton("✗")
         self.skip_btn.setFixedHeight(24)
         self.skip_btn.setFixedWidth(24)
-        self.skip_btn.setStyleSheet("QPushButton { background: #757575; color: white; border: none; border-radius: 3px; font-size: 10px; }")
+        self.skip_btn.setObjectName("skip")
         
         button_layout.addWidget(self.save_btn)
         button_layout.addWidget(self.note_btn)
@@ -124,7 +161,7 @@ class QuickNoteDialog(QDialog):
         """creates header widget for dragging"""
         header_widget = QWidget()
         header_widget.setLayout(layout)
-        header_widget.setStyleSheet("QWidget:hover { background-color: #f0f0f0; }")
+        header_widget.setObjectName("header")
         return header_widget
     
     def expandForNote(self) -> None:
@@ -133,7 +170,7 @@ class QuickNoteDialog(QDialog):
             return
             
         self.is_expanded = True
-        self.auto_close_timer.stop()
+        self.timeline.stop()
         
         # resize to expanded size
         self.setFixedSize(320, 180)
@@ -142,17 +179,17 @@ class QuickNoteDialog(QDialog):
         layout = self.layout()
         
         # fuller citation preview
-        self.preview_label.setText(self.citation_preview[:90] + "..." if len(self.citation_preview) > 90 else self.citation_preview)
+        self.preview_label.setText(self._long_preview)
         
         # note input with custom text edit
         note_label = QLabel("💭 Quick note (Enter to save, Shift+Enter for new line):")
-        note_label.setStyleSheet("font-size: 10px; color: #666; margin-top: 8px;")
+        note_label.setObjectName("noteHint")
         layout.addWidget(note_label)
         
         self.note_input = SmartTextEdit()  # custom text edit
         self.note_input.setPlaceholderText("Tags, thoughts, relevance...")
         self.note_input.setMaximumHeight(50)
-        self.note_input.setStyleSheet("border: 1px solid #ddd; border-radius: 3px; font-size: 11px;")
+        self.note_input.setObjectName("noteInput")
         
         # connect custom enter handling
         self.note_input.enterPressed.connect(self.saveWithNote)
@@ -188,13 +225,6 @@ class QuickNoteDialog(QDialog):
             new_y = screen.bottom() - self.height() - 60
             self.move(current_pos.x(), new_y)
     
-    def updateCountdown(self) -> None:
-        """updates countdown display"""
-        self.remaining_seconds -= 1
-        self.countdown_label.setText(f"{self.remaining_seconds}s")
-        if self.remaining_seconds <= 0:
-            self.countdown_timer.stop()
-    
     def saveNote(self) -> None:
         """saves without note"""
         self.cleanup()
@@ -218,9 +248,8 @@ class QuickNoteDialog(QDialog):
         self.accept()  # auto-save rather than skip
     
     def cleanup(self) -> None:
-        """stops timers"""
-        self.auto_close_timer.stop()
-        self.countdown_timer.stop()
+        """stops the countdown"""
+        self.timeline.stop()
     
     def keyPressEvent(self, event) -> None:
         """handle keyboard shortcuts"""
@@ -240,6 +269,9 @@ class QuickNoteDialog(QDialog):
         """starts drag operation"""
         if event.button() == Qt.MouseButton.LeftButton:
             self.drag_start_position = event.globalPosition().toPoint()
+            # screen and dialog size don't change mid-drag, query them once
+            screen = QApplication.primaryScreen().availableGeometry()
+            self.drag_bounds = (screen.width() - self.width(), screen.height() - self.height())
     
     def mouseMoveEvent(self, event) -> None:
         """handles dragging"""
@@ -247,19 +279,20 @@ class QuickNoteDialog(QDialog):
             self.drag_start_position is not None):
             
             # calculate new position
-            diff = event.globalPosition().toPoint() - self.drag_start_position
-            new_pos = self.pos() + diff
+            global_pos = event.globalPosition().toPoint()
+            new_pos = self.pos() + (global_pos - self.drag_start_position)
             
             # keep window on screen
-            screen = QApplication.primaryScreen().availableGeometry()
-            new_pos.setX(max(0, min(new_pos.x(), screen.width() - self.width())))
-            new_pos.setY(max(0, min(new_pos.y(), screen.height() - self.height())))
+            max_x, max_y = self.drag_bounds
+            new_pos.setX(max(0, min(new_pos.x(), max_x)))
+            new_pos.setY(max(0, min(new_pos.y(), max_y)))
             
             self.move(new_pos)
-            self.drag_start_position = event.globalPosition().toPoint()
+            self.drag_start_position = global_pos
     
     def mouseReleaseEvent(self, event) -> None:
         """ends drag operation"""
         if event.button() == Qt.MouseButton.LeftButton:
             self.drag_start_position = None
+            self.drag_bounds = None
             
\ No newline at end of file